@@ -208,6 +208,60 @@ def check_agent_creation_flow():
         return False
 
 
+def check_buyer_message_engines():
+    """Check that every installed regex engine removes the same contact lines."""
+    print("\n" + "="*60)
+    print("BUYER MESSAGE REGEX ENGINE CHECK")
+    print("="*60)
+    
+    try:
+        import re
+        from services.buyer_message import _compile_contact_res
+        
+        # Contact lines spaced with full-width, non-breaking and ASCII spaces,
+        # emoji prefixes and bold markup, plus lines that must survive
+        samples = [
+            '客服\u3000：@main',
+            'Support\xa0: @main',
+            '官方频道\xa0:a',
+            '\u3000☎️ 客服：@main',
+            '☎️📞️📣️ 客服：x',
+            '\ufe0f客服：x',
+            '<b>📢 Official\u3000Channel：</b>@main',
+            'restock\tgroup: @main',
+            'ſupport: @main',
+            'tutorİal: @main',
+            'Offıcial Channel: @main',
+            '如有问题请联系客服：@x',
+            '客服：\n下一行',
+            '商品说明\n📣 频道：@chan\n谢谢',
+        ]
+        
+        engines = []
+        for name in ('regex', 're2'):
+            try:
+                engines.append(__import__(name))
+            except ImportError:
+                print(f"⚠ {name} = <not installed> (optional)")
+        
+        reference = _compile_contact_res(re)
+        for engine in engines:
+            compiled = _compile_contact_res(engine)
+            for expected_re, actual_re in zip(reference, compiled):
+                for sample in samples:
+                    if expected_re.subn('', sample) != actual_re.subn('', sample):
+                        print(f"❌ {engine.__name__} differs from re on {sample!r}")
+                        return False
+            print(f"✓ {engine.__name__} matches stdlib re")
+        
+        print("\n✅ Buyer message engine check passed")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Failed to check regex engines: {e}")
+        return False
+
+
 def main():
     """Run all verification checks."""
     print("\n" + "="*60)
@@ -220,7 +274,8 @@ def main():
         ("Agent Handlers", check_agent_handlers),
         ("Callback Patterns", check_callback_patterns),
         ("Bot Integration", check_bot_integration),
-        ("Agent Creation Flow", check_agent_creation_flow)
+        ("Agent Creation Flow", check_agent_creation_flow),
+        ("Buyer Message Engines", check_buyer_message_engines)
     ]
     
     results = []